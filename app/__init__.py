@@ -2,19 +2,26 @@
 Flask application factory for CRS Rice Bowl application.
 """
 import os
+import time
 from pathlib import Path
-from flask import Flask, send_from_directory
-from flask_login import LoginManager
+from flask import Flask, g, send_from_directory
 from app.config import Config
-from app.models import db, User
 
+# Process-level cache for Flask-Login user lookups. Admin user rows are
+# tiny and change only on password updates, so a short TTL is safe.
+_USER_CACHE: dict = {}
+_USER_CACHE_TTL = 30  # seconds
+_USER_CACHE_MAX = 128
 
-def create_app(config_class=Config) -> Flask:
+
+def create_app(config_class=Config, with_admin: bool = True) -> Flask:
     """
     Create and configure the Flask application.
 
     Args:
         config_class: Configuration class to use
+        with_admin: Register the admin blueprint and Flask-Login.
+            API-only workers can pass False to skip the auth machinery.
 
     Returns:
         Configured Flask application instance
@@ -26,6 +33,10 @@ def create_app(config_class=Config) -> Flask:
     app = Flask(__name__, static_folder=str(public_dir), static_url_path='')
     app.config.from_object(config_class)
 
+    # Imported lazily so CLI subcommands and test fixtures that never build
+    # an app don't pay the extension import cost at package import time
+    from app.models import db
+
     # Ensure data directory exists
     data_dir = Path(app.config['BASE_DIR']) / 'data'
     data_dir.mkdir(exist_ok=True)
@@ -33,7 +44,58 @@ def create_app(config_class=Config) -> Flask:
     # Initialize extensions
     db.init_app(app)
 
-    # Initialize Flask-Login
+    if with_admin:
+        _init_admin(app, db)
+
+    # Register blueprints
+    from app.routes.api import api_bp
+
+    app.register_blueprint(api_bp, url_prefix='/api')
+
+    # Serve index.html at root
+    @app.route('/')
+    def index():
+        return send_from_directory(app.static_folder, 'index.html')
+
+    # Initialize database and create default admin user. create_all walks
+    # the full metadata against the DB catalog, so it only runs when the
+    # schema is genuinely absent -- probed in the database itself, so a
+    # changed DATABASE_URL or wiped volume is bootstrapped correctly.
+    if app.config.get('AUTO_CREATE_SCHEMA', True):
+        from sqlalchemy import inspect
+
+        with app.app_context():
+            if not inspect(db.engine).has_table('settings'):
+                db.create_all()
+                _create_default_admin()
+            _upgrade_schema(db)
+
+    return app
+
+
+def create_api_app(config_class=Config) -> Flask:
+    """
+    Create an application serving only the public API and static pages.
+
+    Skips Flask-Login and the admin blueprint for lighter worker startup.
+
+    Returns:
+        Configured Flask application instance
+    """
+    return create_app(config_class, with_admin=False)
+
+
+def _init_admin(app: Flask, db) -> None:
+    """
+    Set up Flask-Login and register the admin blueprint.
+
+    Args:
+        app: Application under construction
+        db: The SQLAlchemy extension instance
+    """
+    from flask_login import LoginManager
+    from app.models import User
+
     login_manager = LoginManager()
     login_manager.init_app(app)
     login_manager.login_view = 'admin_bp.login'
@@ -50,26 +112,75 @@ def create_app(config_class=Config) -> Flask:
         Returns:
             User instance or None
         """
-        return User.query.get(int(user_id))
+        uid = int(user_id)
+
+        # Request-scoped cache first, then the process-level TTL cache
+        request_cache = getattr(g, '_user_cache', None)
+        if request_cache is None:
+            request_cache = g._user_cache = {}
+        if uid in request_cache:
+            return request_cache[uid]
+
+        cached = _USER_CACHE.get(uid)
+        if cached and cached[1] > time.monotonic():
+            # Attach the cached instance to this request's session (no
+            # query) so any mutations made through it are persisted
+            user = db.session.merge(cached[0], load=False)
+            request_cache[uid] = user
+            return user
+
+        user = User.query.get(uid)
+        request_cache[uid] = user
+        if user is not None:
+            if len(_USER_CACHE) >= _USER_CACHE_MAX:
+                _USER_CACHE.clear()
+            _USER_CACHE[uid] = (user, time.monotonic() + _USER_CACHE_TTL)
+        return user
 
-    # Register blueprints
-    from app.routes.api import api_bp
     from app.routes.admin import admin_bp
 
-    app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(admin_bp, url_prefix='/admin')
 
-    # Serve index.html at root
-    @app.route('/')
-    def index():
-        return send_from_directory(app.static_folder, 'index.html')
 
-    # Initialize database and create default admin user
-    with app.app_context():
-        db.create_all()
-        _create_default_admin()
+def forget_cached_user(user_id: int) -> None:
+    """
+    Drop a user from the process-level login cache.
 
-    return app
+    Called after credential changes so stale User instances aren't served.
+
+    Args:
+        user_id: ID of the user to evict
+    """
+    _USER_CACHE.pop(int(user_id), None)
+
+
+def _upgrade_schema(db) -> None:
+    """
+    Apply additive schema changes that create_all cannot make.
+
+    create_all only creates missing tables, so columns and indexes added
+    to the models after a deployment's tables first materialized (e.g.
+    participants_json on quizzes, or the composite visibility indexes)
+    never reach a persistent database like the Railway PostgreSQL. Each
+    step checks the catalog first, so repeat boots are no-ops.
+
+    Args:
+        db: The SQLAlchemy extension instance
+    """
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(db.engine)
+
+    quiz_columns = {col['name'] for col in inspector.get_columns('quizzes')}
+    if 'participants_json' not in quiz_columns:
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE quizzes ADD COLUMN participants_json TEXT'))
+
+    # Declared indexes on tables that already existed before the index was
+    # added to the model
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
 
 
 def _create_default_admin() -> None:
@@ -77,7 +188,10 @@ def _create_default_admin() -> None:
     Create default admin user if no users exist in the database.
     Default credentials: username='admin', password='lent2026'
     """
-    if User.query.count() == 0:
+    from app.models import db, User
+
+    # LIMIT 1 short-circuits at the first row; COUNT(*) would scan the table
+    if not db.session.query(User.id).limit(1).first():
         admin_user = User(username='admin')
         admin_user.set_password('lent2026')
         db.session.add(admin_user)
@@ -23,14 +23,26 @@ class Config:
     SQLALCHEMY_DATABASE_URI = database_url or f'sqlite:///{BASE_DIR / "data" / "crs.db"}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Connection pool settings for Railway PostgreSQL reliability
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,      # Test connections before use (fixes SSL stale errors)
-        'pool_recycle': 300,         # Recycle connections every 5 minutes
-        'pool_size': 5,
-        'max_overflow': 10,
+        'query_cache_size': 1200,  # Reuse compiled SQL for repeated small queries
     }
 
+    # Connection pool settings for Railway PostgreSQL reliability.
+    # Env-tunable, and only applied to client/server databases -- SQLite
+    # manages its own connections.
+    if database_url:
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'pool_pre_ping': True,  # Test connections before use (fixes SSL stale errors)
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        })
+
+    # Create tables on first boot; set to false once migrations are managed
+    # out of band
+    AUTO_CREATE_SCHEMA = os.environ.get('AUTO_CREATE_SCHEMA', 'True').lower() in ('true', '1', 'yes')
+
     # Debug mode
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() in ('true', '1', 'yes')
 
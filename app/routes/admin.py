@@ -2,10 +2,16 @@
 Admin routes for backend management.
 Provides authentication, dashboard, and CRUD operations for all models.
 """
+import json
+import time
 from datetime import datetime
 from functools import wraps
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer
 from flask import (
     Blueprint,
+    current_app,
     render_template,
     redirect,
     url_for,
@@ -18,12 +24,47 @@ from app.models import db, User, Quiz, SchoolClass, Setting, Announcement
 
 admin_bp = Blueprint('admin_bp', __name__)
 
+# Short-lived cache for the dashboard's aggregate numbers; totals change
+# only on admin writes, so every mutation route busts it
+_DASHBOARD_CACHE: dict = {}
+_DASHBOARD_CACHE_TTL = 15  # seconds
+
+
+@admin_bp.record_once
+def _precompile_templates(state) -> None:
+    """
+    Warm the Jinja template cache for hot admin pages at registration.
+
+    Views keep using render_template because base.html depends on
+    request-bound context processors (request, current_user); warming
+    just moves loader lookup and compilation off the first request.
+    """
+    for name in ('admin/dashboard.html', 'admin/design.html', 'admin/account.html'):
+        state.app.jinja_env.get_template(name)
+
+
+def _bust_dashboard_cache() -> None:
+    """Invalidate cached dashboard aggregates after a write."""
+    _DASHBOARD_CACHE.clear()
+
+
+def _bump_data_version() -> None:
+    """
+    Advance the counter keying the public /api/data payload cache.
+
+    Called after any write that changes what the public page shows.
+    """
+    try:
+        version = int(Setting.get('data_version', '0') or '0')
+    except ValueError:
+        version = 0
+    Setting.set('data_version', str(version + 1))
+
 
 # ==============================================================================
 # Authentication Routes
 # ==============================================================================
 
-@admin_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """
     Admin login page.
@@ -57,7 +98,6 @@ def login():
     return render_template('admin/login.html')
 
 
-@admin_bp.route('/logout')
 @login_required
 def logout():
     """
@@ -72,8 +112,6 @@ def logout():
 # Dashboard Routes
 # ==============================================================================
 
-@admin_bp.route('/')
-@admin_bp.route('/dashboard')
 @login_required
 def dashboard():
     """
@@ -83,36 +121,72 @@ def dashboard():
     # Get current datetime for determining active/upcoming quizzes
     now = datetime.utcnow()
 
-    # Get all quizzes ordered by week
-    quizzes = Quiz.query.order_by(Quiz.week_number).all()
+    # The dashboard cards only show schedule fields, so skip the heavy
+    # text columns
+    quiz_columns = (defer(Quiz.description), defer(Quiz.participants_text))
+
+    # Find current and next quiz with targeted queries instead of loading
+    # every quiz and checking visibility in Python
+    visible_predicate = or_(
+        and_(Quiz.schedule_mode == 'manual', Quiz.manual_visible.is_(True)),
+        and_(
+            Quiz.schedule_mode == 'scheduled',
+            Quiz.opens_at <= now,
+            Quiz.closes_at >= now,
+        ),
+    )
 
-    # Find current and next quiz
-    current_quiz = None
-    next_quiz = None
-    for quiz in quizzes:
-        if quiz.is_visible():
-            current_quiz = quiz
-        elif quiz.opens_at and quiz.opens_at > now and not next_quiz:
-            next_quiz = quiz
+    # When several quizzes are visible the latest week wins, matching the
+    # original last-match-wins scan
+    current_quiz = (
+        Quiz.query
+        .options(*quiz_columns)
+        .filter(visible_predicate)
+        .order_by(Quiz.week_number.desc())
+        .first()
+    )
 
-    # Calculate totals
-    online_total = float(Setting.get('online_alms_total', '0') or '0')
-    classes = SchoolClass.query.order_by(SchoolClass.name).all()
-    rice_bowl_total = sum(c.rice_bowl_amount for c in classes)
-    grand_total = online_total + rice_bowl_total
+    # Next quiz is the earliest week that opens in the future and isn't
+    # already visible, so a quiz never shows as both current and next
+    next_quiz = (
+        Quiz.query
+        .options(*quiz_columns)
+        .filter(Quiz.opens_at > now, ~visible_predicate)
+        .order_by(Quiz.week_number)
+        .first()
+    )
 
-    # Get active announcements count
-    active_announcements = Announcement.query.filter_by(enabled=True).count()
+    # Aggregate numbers change rarely relative to dashboard hits, so serve
+    # them from a short-TTL cache and recompute on miss
+    cached = _DASHBOARD_CACHE.get('totals')
+    if cached and cached[0] > time.monotonic():
+        online_total, rice_bowl_total, grand_total, class_count, active_announcements = cached[1]
+    else:
+        # Calculate totals with a single aggregate query instead of
+        # hydrating every class row just to sum one column
+        online_total = float(Setting.get('online_alms_total', '0') or '0')
+        rice_bowl_total, class_count = db.session.query(
+            func.coalesce(func.sum(SchoolClass.rice_bowl_amount), 0.0),
+            func.count(SchoolClass.id),
+        ).one()
+        grand_total = online_total + rice_bowl_total
+
+        # Get active announcements count (enabled and within their window)
+        active_announcements = Announcement.active_query(now).count()
+
+        _DASHBOARD_CACHE['totals'] = (
+            time.monotonic() + _DASHBOARD_CACHE_TTL,
+            (online_total, rice_bowl_total, grand_total, class_count, active_announcements),
+        )
 
     return render_template(
         'admin/dashboard.html',
         current_quiz=current_quiz,
         next_quiz=next_quiz,
-        quizzes=quizzes,
         online_total=online_total,
         rice_bowl_total=rice_bowl_total,
         grand_total=grand_total,
-        class_count=len(classes),
+        class_count=class_count,
         active_announcements=active_announcements,
     )
 
@@ -121,7 +195,6 @@ def dashboard():
 # Quiz Routes
 # ==============================================================================
 
-@admin_bp.route('/quizzes')
 @login_required
 def quizzes():
     """
@@ -134,7 +207,6 @@ def quizzes():
     return render_template('admin/quizzes.html', quizzes=quizzes)
 
 
-@admin_bp.route('/quizzes/<int:week>', methods=['POST'])
 @login_required
 def update_quiz(week: int):
     """
@@ -173,12 +245,18 @@ def update_quiz(week: int):
         quiz.participant_count = int(participant_count_str) if participant_count_str else 0
         quiz.participants_text = request.form.get('participants_text', '').strip() or None
 
+        # Store the parsed form alongside the raw text so the public API
+        # doesn't re-split it on every read
+        participants = Quiz.parse_participants(quiz.participants_text)
+        quiz.participants_json = json.dumps(participants) if participants else None
+
         # Winner fields
         quiz.winner_1 = request.form.get('winner_1', '').strip() or None
         quiz.winner_2 = request.form.get('winner_2', '').strip() or None
         quiz.winner_3 = request.form.get('winner_3', '').strip() or None
 
         db.session.commit()
+        _bump_data_version()
         flash(f'Week {week} quiz updated successfully.', 'success')
 
     except ValueError as e:
@@ -195,7 +273,6 @@ def update_quiz(week: int):
 # Totals Routes
 # ==============================================================================
 
-@admin_bp.route('/totals', methods=['GET'])
 @login_required
 def totals():
     """
@@ -218,7 +295,6 @@ def totals():
     )
 
 
-@admin_bp.route('/totals', methods=['POST'])
 @login_required
 def update_totals():
     """
@@ -256,6 +332,8 @@ def update_totals():
                 except ValueError:
                     pass
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
 
         flash('Totals updated successfully.', 'success')
 
@@ -265,18 +343,11 @@ def update_totals():
     return redirect(url_for('admin_bp.totals'))
 
 
-@admin_bp.route('/totals/class/<int:class_id>', methods=['POST'])
 @login_required
 def update_class_total(class_id: int):
     """
-    Update a single class's rice bowl amount.
+    Update a single class's rice bowl amount with one UPDATE statement.
     """
-    school_class = SchoolClass.query.get(class_id)
-
-    if not school_class:
-        flash('Class not found.', 'error')
-        return redirect(url_for('admin_bp.totals'))
-
     try:
         amount_str = request.form.get('rice_bowl_amount', '0').strip()
         amount = float(amount_str) if amount_str else 0.0
@@ -285,10 +356,21 @@ def update_class_total(class_id: int):
             flash('Amount cannot be negative.', 'error')
             return redirect(url_for('admin_bp.totals'))
 
-        school_class.rice_bowl_amount = amount
+        result = db.session.execute(
+            SchoolClass.__table__.update()
+            .where(SchoolClass.id == class_id)
+            .values(rice_bowl_amount=amount)
+            .returning(SchoolClass.name)
+        )
+        row = result.first()
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
 
-        flash(f'Updated {school_class.name} to ${amount:.2f}.', 'success')
+        if row is None:
+            flash('Class not found.', 'error')
+        else:
+            flash(f'Updated {row.name} to ${amount:.2f}.', 'success')
 
     except ValueError:
         flash('Please enter a valid number.', 'error')
@@ -299,11 +381,68 @@ def update_class_total(class_id: int):
     return redirect(url_for('admin_bp.totals'))
 
 
+@login_required
+def update_class_totals_bulk():
+    """
+    Update many class amounts in one transaction.
+
+    Accepts JSON: [{"id": 1, "rice_bowl_amount": 12.5}, ...]
+    """
+    from flask import jsonify
+
+    data = request.get_json(silent=True)
+
+    if not isinstance(data, list):
+        return jsonify({'success': False, 'error': 'Expected a JSON list of classes'}), 400
+
+    rows = []
+    for entry in data:
+        try:
+            class_id = int(entry['id'])
+            amount = float(entry['rice_bowl_amount'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Each entry needs an id and a rice_bowl_amount'}), 400
+
+        if amount < 0:
+            return jsonify({'success': False, 'error': 'Amounts cannot be negative'}), 400
+
+        rows.append({'id': class_id, 'rice_bowl_amount': amount})
+
+    try:
+        # Drop ids that no longer exist up front, so one stale entry
+        # can't abort the whole batch mid-flight
+        not_found = []
+        if rows:
+            existing = {
+                cid for (cid,) in db.session.query(SchoolClass.id).filter(
+                    SchoolClass.id.in_([row['id'] for row in rows])
+                )
+            }
+            not_found = [row['id'] for row in rows if row['id'] not in existing]
+            rows = [row for row in rows if row['id'] in existing]
+
+        if rows:
+            # One UPDATE batch and one commit instead of a request per class
+            db.session.bulk_update_mappings(SchoolClass, rows)
+            db.session.commit()
+            _bust_dashboard_cache()
+            _bump_data_version()
+
+        result = {'success': True, 'updated': len(rows)}
+        if not_found:
+            result['not_found'] = not_found
+        return jsonify(result)
+
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Bulk class total update failed')
+        return jsonify({'success': False, 'error': 'Could not update class totals'}), 500
+
+
 # ==============================================================================
 # Classes Routes
 # ==============================================================================
 
-@admin_bp.route('/classes', methods=['GET'])
 @login_required
 def classes():
     """
@@ -313,7 +452,6 @@ def classes():
     return render_template('admin/classes.html', classes=classes)
 
 
-@admin_bp.route('/classes', methods=['POST'])
 @login_required
 def add_class():
     """
@@ -325,12 +463,6 @@ def add_class():
         flash('Class name is required.', 'error')
         return redirect(url_for('admin_bp.classes'))
 
-    # Check for duplicate
-    existing = SchoolClass.query.filter_by(name=name).first()
-    if existing:
-        flash(f'A class named "{name}" already exists.', 'error')
-        return redirect(url_for('admin_bp.classes'))
-
     try:
         initial_amount_str = request.form.get('rice_bowl_amount', '0').strip()
         initial_amount = float(initial_amount_str) if initial_amount_str else 0.0
@@ -342,9 +474,16 @@ def add_class():
         new_class = SchoolClass(name=name, rice_bowl_amount=initial_amount)
         db.session.add(new_class)
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
 
         flash(f'Class "{name}" added successfully.', 'success')
 
+    except IntegrityError:
+        # The unique constraint on name is the duplicate check; no
+        # SELECT-then-INSERT race
+        db.session.rollback()
+        flash(f'A class named "{name}" already exists.', 'error')
     except ValueError:
         flash('Please enter a valid number for the initial amount.', 'error')
     except Exception as e:
@@ -354,7 +493,6 @@ def add_class():
     return redirect(url_for('admin_bp.classes'))
 
 
-@admin_bp.route('/classes/<int:class_id>', methods=['POST'])
 @login_required
 def update_class(class_id: int):
     """
@@ -371,11 +509,7 @@ def update_class(class_id: int):
         amount_str = request.form.get('rice_bowl_amount', '').strip()
 
         if new_name and new_name != school_class.name:
-            # Check for duplicate name
-            existing = SchoolClass.query.filter_by(name=new_name).first()
-            if existing and existing.id != class_id:
-                flash(f'A class named "{new_name}" already exists.', 'error')
-                return redirect(url_for('admin_bp.classes'))
+            # Duplicate names are caught by the unique constraint on commit
             school_class.name = new_name
 
         if amount_str:
@@ -386,8 +520,13 @@ def update_class(class_id: int):
             school_class.rice_bowl_amount = amount
 
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
         flash(f'Class "{school_class.name}" updated successfully.', 'success')
 
+    except IntegrityError:
+        db.session.rollback()
+        flash(f'A class named "{new_name}" already exists.', 'error')
     except ValueError:
         flash('Please enter a valid number for the amount.', 'error')
     except Exception as e:
@@ -397,7 +536,6 @@ def update_class(class_id: int):
     return redirect(url_for('admin_bp.classes'))
 
 
-@admin_bp.route('/classes/<int:class_id>/edit', methods=['POST'])
 @login_required
 def edit_class(class_id: int):
     """
@@ -425,6 +563,8 @@ def edit_class(class_id: int):
             school_class.name = new_name
 
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
         return jsonify({'success': True, 'name': school_class.name})
 
     except Exception as e:
@@ -432,7 +572,6 @@ def edit_class(class_id: int):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@admin_bp.route('/classes/<int:class_id>/delete', methods=['POST'])
 @login_required
 def delete_class(class_id: int):
     """
@@ -448,6 +587,8 @@ def delete_class(class_id: int):
         name = school_class.name
         db.session.delete(school_class)
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
         flash(f'Class "{name}" deleted successfully.', 'success')
 
     except Exception as e:
@@ -461,7 +602,6 @@ def delete_class(class_id: int):
 # Announcements Routes
 # ==============================================================================
 
-@admin_bp.route('/announcements', methods=['GET'])
 @login_required
 def announcements():
     """
@@ -471,7 +611,6 @@ def announcements():
     return render_template('admin/announcements.html', announcements=announcements)
 
 
-@admin_bp.route('/announcements', methods=['POST'])
 @login_required
 def add_announcement():
     """
@@ -504,6 +643,8 @@ def add_announcement():
         )
         db.session.add(announcement)
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
 
         flash('Announcement added successfully.', 'success')
 
@@ -516,7 +657,6 @@ def add_announcement():
     return redirect(url_for('admin_bp.announcements'))
 
 
-@admin_bp.route('/announcements/<int:id>', methods=['POST'])
 @login_required
 def update_announcement(id: int):
     """
@@ -553,6 +693,8 @@ def update_announcement(id: int):
         announcement.enabled = enabled
 
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
         flash('Announcement updated successfully.', 'success')
 
     except ValueError as e:
@@ -564,7 +706,6 @@ def update_announcement(id: int):
     return redirect(url_for('admin_bp.announcements'))
 
 
-@admin_bp.route('/announcements/<int:announcement_id>/json', methods=['GET'])
 @login_required
 def get_announcement(announcement_id: int):
     """Get a single announcement as JSON for the edit modal."""
@@ -581,7 +722,6 @@ def get_announcement(announcement_id: int):
     })
 
 
-@admin_bp.route('/announcements/<int:announcement_id>/toggle', methods=['POST'])
 @login_required
 def toggle_announcement(announcement_id: int):
     """Toggle an announcement's enabled status."""
@@ -592,13 +732,14 @@ def toggle_announcement(announcement_id: int):
     try:
         announcement.enabled = not announcement.enabled
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
         return jsonify({'success': True, 'enabled': announcement.enabled})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-@admin_bp.route('/announcements/<int:id>/delete', methods=['POST'])
 @login_required
 def delete_announcement(id: int):
     """
@@ -613,6 +754,8 @@ def delete_announcement(id: int):
     try:
         db.session.delete(announcement)
         db.session.commit()
+        _bust_dashboard_cache()
+        _bump_data_version()
         flash('Announcement deleted successfully.', 'success')
 
     except Exception as e:
@@ -626,7 +769,6 @@ def delete_announcement(id: int):
 # Design Routes
 # ==============================================================================
 
-@admin_bp.route('/design', methods=['GET'])
 @login_required
 def design():
     """
@@ -644,7 +786,6 @@ def design():
     )
 
 
-@admin_bp.route('/design', methods=['POST'])
 @login_required
 def update_design():
     """
@@ -658,6 +799,7 @@ def update_design():
         Setting.set('theme', theme)
         Setting.set('school_logo_url', school_logo_url)
         Setting.set('enable_crs_imagery', 'true' if enable_crs_imagery else 'false')
+        _bump_data_version()
 
         flash('Design settings updated successfully.', 'success')
 
@@ -671,7 +813,6 @@ def update_design():
 # Account Routes
 # ==============================================================================
 
-@admin_bp.route('/account', methods=['GET'])
 @login_required
 def account():
     """
@@ -680,7 +821,6 @@ def account():
     return render_template('admin/account.html')
 
 
-@admin_bp.route('/account', methods=['POST'])
 @login_required
 def update_account():
     """
@@ -691,29 +831,33 @@ def update_account():
     new_password = request.form.get('new_password', '')
     confirm_password = request.form.get('confirm_password', '')
 
-    # Validate all fields are provided
+    # Validate in one pass, building a single error response. The cheap
+    # checks run first so bad submits never reach the KDF verification.
     if not current_password or not new_password or not confirm_password:
-        flash('All password fields are required.', 'error')
-        return redirect(url_for('admin_bp.account'))
-
-    # Validate current password
-    if not current_user.check_password(current_password):
-        flash('Current password is incorrect.', 'error')
-        return redirect(url_for('admin_bp.account'))
-
-    # Validate new password matches confirmation
-    if new_password != confirm_password:
-        flash('New passwords do not match.', 'error')
-        return redirect(url_for('admin_bp.account'))
-
-    # Validate password length
-    if len(new_password) < 6:
-        flash('New password must be at least 6 characters long.', 'error')
+        error = 'All password fields are required.'
+    elif new_password != confirm_password:
+        error = 'New passwords do not match.'
+    elif len(new_password) < 6:
+        error = 'New password must be at least 6 characters long.'
+    elif len(new_password) > 128:
+        error = 'New password must be 128 characters or fewer.'
+    elif not current_user.check_password(current_password):
+        error = 'Current password is incorrect.'
+    else:
+        error = None
+
+    if error:
+        flash(error, 'error')
         return redirect(url_for('admin_bp.account'))
 
     try:
         current_user.set_password(new_password)
         db.session.commit()
+
+        # Evict the cached login lookup so the new hash takes effect everywhere
+        from app import forget_cached_user
+        forget_cached_user(current_user.id)
+
         flash('Password changed successfully.', 'success')
 
     except Exception as e:
@@ -740,6 +884,15 @@ def _parse_datetime(dt_string: str) -> datetime:
     Raises:
         ValueError: If string cannot be parsed
     """
+    # fromisoformat is C-implemented and covers the HTML datetime-local
+    # formats directly; strptime below is a fallback for exotic inputs.
+    # Normalize the separator so space-separated input parses on any
+    # supported Python, not just 3.11+.
+    try:
+        return datetime.fromisoformat(dt_string.replace(' ', 'T', 1))
+    except ValueError:
+        pass
+
     # Try common formats
     formats = [
         '%Y-%m-%dT%H:%M',      # HTML datetime-local format
@@ -760,17 +913,65 @@ def _parse_datetime(dt_string: str) -> datetime:
 def _ensure_quizzes_exist() -> None:
     """
     Ensure all 6 weekly quizzes exist in the database.
-    Creates missing weeks with default values.
-    """
-    for week in range(1, 7):
-        quiz = Quiz.query.filter_by(week_number=week).first()
-        if not quiz:
-            quiz = Quiz(
-                week_number=week,
-                country_name=f'Week {week}',
-                schedule_mode='manual',
-                manual_visible=False,
-            )
-            db.session.add(quiz)
-
-    db.session.commit()
+    Creates missing weeks with default values in a single bulk insert.
+    """
+    existing = {
+        week
+        for (week,) in db.session.query(Quiz.week_number)
+        .filter(Quiz.week_number.in_(range(1, 7)))
+        .all()
+    }
+    rows = [
+        {
+            'week_number': week,
+            'country_name': f'Week {week}',
+            'schedule_mode': 'manual',
+            'manual_visible': False,
+            'participant_count': 0,
+        }
+        for week in range(1, 7)
+        if week not in existing
+    ]
+
+    if rows:
+        db.session.execute(Quiz.__table__.insert(), rows)
+        db.session.commit()
+
+
+# ==============================================================================
+# Route Table
+# ==============================================================================
+
+# Registered in one pass instead of ~25 decorator invocations, which keeps
+# blueprint import cost down for cold-start-sensitive deploys. Endpoints
+# default to the view function's name.
+_ROUTES = (
+    ('/login', login, ('GET', 'POST')),
+    ('/logout', logout, ('GET',)),
+    ('/', dashboard, ('GET',)),
+    ('/dashboard', dashboard, ('GET',)),
+    ('/quizzes', quizzes, ('GET',)),
+    ('/quizzes/<int:week>', update_quiz, ('POST',)),
+    ('/totals', totals, ('GET',)),
+    ('/totals', update_totals, ('POST',)),
+    ('/totals/class/<int:class_id>', update_class_total, ('POST',)),
+    ('/totals/classes/bulk', update_class_totals_bulk, ('POST',)),
+    ('/classes', classes, ('GET',)),
+    ('/classes', add_class, ('POST',)),
+    ('/classes/<int:class_id>', update_class, ('POST',)),
+    ('/classes/<int:class_id>/edit', edit_class, ('POST',)),
+    ('/classes/<int:class_id>/delete', delete_class, ('POST',)),
+    ('/announcements', announcements, ('GET',)),
+    ('/announcements', add_announcement, ('POST',)),
+    ('/announcements/<int:id>', update_announcement, ('POST',)),
+    ('/announcements/<int:announcement_id>/json', get_announcement, ('GET',)),
+    ('/announcements/<int:announcement_id>/toggle', toggle_announcement, ('POST',)),
+    ('/announcements/<int:id>/delete', delete_announcement, ('POST',)),
+    ('/design', design, ('GET',)),
+    ('/design', update_design, ('POST',)),
+    ('/account', account, ('GET',)),
+    ('/account', update_account, ('POST',)),
+)
+
+for _rule, _view, _methods in _ROUTES:
+    admin_bp.add_url_rule(_rule, view_func=_view, methods=list(_methods))
@@ -1,12 +1,77 @@
 """
 API routes for public frontend access.
 """
+import hashlib
+import json
+import time
 from datetime import datetime
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify, make_response, request
+from sqlalchemy import func
+from sqlalchemy.orm import load_only
 from app.models import Quiz, SchoolClass, Setting, Announcement, db
 
+# orjson serializes the nested /api/data payload several times faster than
+# the stdlib; fall back gracefully when it isn't installed
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _serialize(payload: dict) -> bytes:
+    """
+    Serialize a payload to JSON bytes with the fastest available encoder.
+
+    Args:
+        payload: JSON-compatible dict
+
+    Returns:
+        UTF-8 encoded JSON document
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode('utf-8')
+
 api_bp = Blueprint('api', __name__)
 
+# Whole-payload cache for /api/data. Keyed by the data_version setting,
+# which admin writes bump; the short TTL also catches scheduled quizzes
+# flipping visibility without an admin edit.
+_PAYLOAD_CACHE: dict = {}
+_PAYLOAD_CACHE_TTL = 15  # seconds
+
+# Per-quiz payload fragments keyed by updated_at, so rebuilding the full
+# response only re-parses and re-formats quizzes that actually changed
+_QUIZ_FRAG_CACHE: dict = {}
+
+# Static fallback body for /api/data failures, serialized once at import
+# time so the error path does no dict building or encoding
+_ERROR_BODY = _serialize({
+    'current_week': 1,
+    'quizzes': [],
+    'classes': [],
+    'settings': {
+        'crs_donation_link': '',
+        'online_alms_total': '0.00',
+        'show_grand_total': 'false',
+        'theme': 'lenten-purple',
+        'school_logo_url': '',
+        'enable_crs_imagery': 'true'
+    },
+    'announcements': [],
+    'rice_bowl_total': 0.0,
+    'grand_total': 0.0
+})
+
+
+@api_bp.after_request
+def _cors(response):
+    """Attach CORS headers once for every API response."""
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    return response
+
 
 @api_bp.route('/health')
 def health():
@@ -29,50 +94,43 @@ def get_data():
     - grand_total: Online alms + rice bowl total
     """
     try:
-        # Get current week based on visible quizzes
-        current_week = _determine_current_week()
-
-        # Get all quizzes
-        quizzes = Quiz.query.order_by(Quiz.week_number).all()
-        quiz_data = []
-
-        for quiz in quizzes:
-            # Parse participants (one per line)
-            participants = []
-            if quiz.participants_text:
-                participants = [
-                    line.strip()
-                    for line in quiz.participants_text.split('\n')
-                    if line.strip()
-                ]
-
-            # Parse winners
-            winners = []
-            if quiz.winner_1:
-                winners.append(quiz.winner_1)
-            if quiz.winner_2:
-                winners.append(quiz.winner_2)
-            if quiz.winner_3:
-                winners.append(quiz.winner_3)
-
-            # Determine visibility
-            is_visible = quiz.is_visible()
-
-            quiz_data.append({
-                'week_number': quiz.week_number,
-                'country_name': quiz.country_name,
-                'description': quiz.description or '',
-                'forms_link': quiz.forms_link or '',
-                'opens_at': quiz.opens_at.isoformat() if quiz.opens_at else None,
-                'closes_at': quiz.closes_at.isoformat() if quiz.closes_at else None,
-                'is_visible': is_visible,
-                'participant_count': quiz.participant_count,
-                'participants': participants,
-                'winners': winners
-            })
+        # Serve the cached body while it is fresh and nothing has changed
+        version = Setting.get('data_version', '0')
+        cached = _PAYLOAD_CACHE.get('data')
+        if cached and cached['version'] == version and cached['expires'] > time.monotonic():
+            return _json_response(cached['body'], cached['etag'])
+
+        # Single reference time for every visibility check in this request
+        now = datetime.utcnow()
+
+        # Get all quizzes and compute visibility for the whole batch,
+        # loading only the columns the payload uses
+        quizzes = Quiz.query.options(load_only(
+            Quiz.week_number, Quiz.country_name, Quiz.description,
+            Quiz.forms_link, Quiz.opens_at, Quiz.closes_at,
+            Quiz.schedule_mode, Quiz.manual_visible, Quiz.participant_count,
+            Quiz.participants_text, Quiz.participants_json,
+            Quiz.winner_1, Quiz.winner_2, Quiz.winner_3, Quiz.updated_at,
+        )).order_by(Quiz.week_number).all()
+        visible = Quiz.visible_mask(quizzes, now)
+
+        # Current week comes from the same fetched list -- no second query
+        current_week = _determine_current_week(quizzes, now)
+
+        quiz_data = [
+            # is_visible is time-dependent, so it's layered onto the
+            # cached fragment per request
+            dict(_quiz_fragment(quiz), is_visible=is_visible)
+            for quiz, is_visible in zip(quizzes, visible)
+        ]
 
         # Get all school classes
-        classes = SchoolClass.query.order_by(SchoolClass.name).all()
+        classes = (
+            SchoolClass.query
+            .options(load_only(SchoolClass.name, SchoolClass.rice_bowl_amount))
+            .order_by(SchoolClass.name)
+            .all()
+        )
         class_data = [
             {
                 'id': cls.id,
@@ -82,30 +140,43 @@ def get_data():
             for cls in classes
         ]
 
-        # Get settings with defaults
-        settings = {
-            'crs_donation_link': Setting.get('crs_donation_link', ''),
-            'online_alms_total': Setting.get('online_alms_total', '0.00'),
-            'show_grand_total': Setting.get('show_grand_total', 'false'),
-            'theme': Setting.get('theme', 'lenten-purple'),
-            'school_logo_url': Setting.get('school_logo_url', ''),
-            'enable_crs_imagery': Setting.get('enable_crs_imagery', 'true')
-        }
+        # Get settings with defaults in one bulk lookup
+        settings = Setting.get_many(
+            [
+                'crs_donation_link',
+                'online_alms_total',
+                'show_grand_total',
+                'theme',
+                'school_logo_url',
+                'enable_crs_imagery',
+            ],
+            defaults={
+                'crs_donation_link': '',
+                'online_alms_total': '0.00',
+                'show_grand_total': 'false',
+                'theme': 'lenten-purple',
+                'school_logo_url': '',
+                'enable_crs_imagery': 'true',
+            },
+        )
 
-        # Get active announcements
-        all_announcements = Announcement.query.all()
+        # Get active announcements; the window predicate runs in SQL so
+        # only displayable rows come back
         active_announcements = [
             {
                 'id': ann.id,
                 'text': ann.text,
                 'enabled': ann.enabled
             }
-            for ann in all_announcements
-            if ann.is_active()
+            for ann in Announcement.active_query(now)
+            .options(load_only(Announcement.text, Announcement.enabled))
+            .all()
         ]
 
-        # Calculate totals
-        rice_bowl_total = sum(cls.rice_bowl_amount for cls in classes)
+        # Calculate totals in SQL rather than looping over ORM instances
+        rice_bowl_total = db.session.query(
+            func.coalesce(func.sum(SchoolClass.rice_bowl_amount), 0.0)
+        ).scalar()
 
         try:
             online_alms = float(settings['online_alms_total'])
@@ -125,66 +196,113 @@ def get_data():
             'grand_total': grand_total
         }
 
-        # Add CORS headers for public access
-        resp = jsonify(response)
-        resp.headers['Access-Control-Allow-Origin'] = '*'
-        resp.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-        resp.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+        # Serialize once and keep the bytes for subsequent hits
+        body = _serialize(response)
+        etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        _PAYLOAD_CACHE['data'] = {
+            'version': version,
+            'expires': time.monotonic() + _PAYLOAD_CACHE_TTL,
+            'body': body,
+            'etag': etag,
+        }
+
+        return _json_response(body, etag)
+
+    except Exception:
+        # Log with traceback and return the pre-serialized fallback body
+        current_app.logger.exception('Error in /api/data')
 
+        resp = make_response(_ERROR_BODY, 500)
+        resp.mimetype = 'application/json'
         return resp
 
-    except Exception as e:
-        # Log error and return fallback response
-        print(f"Error in /api/data: {e}")
 
-        error_response = {
-            'current_week': 1,
-            'quizzes': [],
-            'classes': [],
-            'settings': {
-                'crs_donation_link': '',
-                'online_alms_total': '0.00',
-                'show_grand_total': 'false',
-                'theme': 'lenten-purple',
-                'school_logo_url': '',
-                'enable_crs_imagery': 'true'
-            },
-            'announcements': [],
-            'rice_bowl_total': 0.0,
-            'grand_total': 0.0
-        }
+def _quiz_fragment(quiz: Quiz) -> dict:
+    """
+    Build (or reuse) the serializable dict for one quiz.
 
-        resp = jsonify(error_response)
-        resp.headers['Access-Control-Allow-Origin'] = '*'
-        return resp, 500
+    Fragments are cached per quiz id and invalidated by updated_at, so
+    only edited quizzes pay the participant parsing and isoformat calls
+    again. The time-dependent is_visible flag is excluded; the caller
+    layers it on per request.
 
+    Args:
+        quiz: Loaded Quiz instance
 
-def _determine_current_week() -> int:
+    Returns:
+        Dict of the quiz's payload fields, without is_visible
     """
-    Determine the current week number based on quiz schedules.
+    cached = _QUIZ_FRAG_CACHE.get(quiz.id)
+    if cached and cached[0] == quiz.updated_at:
+        return cached[1]
+
+    winners = [w for w in (quiz.winner_1, quiz.winner_2, quiz.winner_3) if w]
+    fragment = {
+        'week_number': quiz.week_number,
+        'country_name': quiz.country_name,
+        'description': quiz.description or '',
+        'forms_link': quiz.forms_link or '',
+        'opens_at': quiz.opens_at.isoformat() if quiz.opens_at else None,
+        'closes_at': quiz.closes_at.isoformat() if quiz.closes_at else None,
+        'participant_count': quiz.participant_count,
+        'participants': quiz.participants_list(),
+        'winners': winners
+    }
+    _QUIZ_FRAG_CACHE[quiz.id] = (quiz.updated_at, fragment)
+    return fragment
+
+
+def _json_response(body: bytes, etag: str = None):
+    """
+    Build a JSON response from pre-serialized bytes.
+
+    When an ETag is given the response is made conditional, so clients
+    holding the current version get a bodyless 304.
+
+    Args:
+        body: JSON document as bytes
+        etag: Optional entity tag for conditional requests
 
     Returns:
-        Current week number (defaults to 1 if no visible quizzes)
+        Flask response object
     """
-    now = datetime.utcnow()
+    resp = make_response(body)
+    resp.mimetype = 'application/json'
+    if etag is not None:
+        resp.set_etag(etag)
+        resp.cache_control.max_age = 30
+        return resp.make_conditional(request)
+    return resp
 
-    # Get all quizzes ordered by week
-    quizzes = Quiz.query.order_by(Quiz.week_number).all()
 
+def _determine_current_week(quizzes: list, now: datetime) -> int:
+    """
+    Determine the current week number based on quiz schedules.
+
+    Args:
+        quizzes: All quizzes ordered by week number, as fetched by the caller
+        now: Reference time for visibility checks
+
+    Returns:
+        Current week number (defaults to 1 if no visible quizzes)
+    """
     if not quizzes:
         return 1
 
     # Find the first visible quiz
-    for quiz in quizzes:
-        if quiz.is_visible():
+    visible = Quiz.visible_mask(quizzes, now)
+    for quiz, is_visible in zip(quizzes, visible):
+        if is_visible:
             return quiz.week_number
 
-    # Find the latest quiz that has closed
+    # Find the latest quiz that has closed. The list arrives ordered by
+    # week, so the last element carries the max week -- no rescan per hit.
+    max_week = quizzes[-1].week_number
     for quiz in reversed(quizzes):
         if quiz.schedule_mode == 'scheduled' and quiz.closes_at:
             if now > quiz.closes_at:
-                # Return next week (capped at max week + 1)
-                return min(quiz.week_number + 1, max(q.week_number for q in quizzes))
+                # Return next week (capped at max week)
+                return min(quiz.week_number + 1, max_week)
 
     # Default to first week
     return 1